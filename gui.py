@@ -1,10 +1,17 @@
 # gui.py
+import time
+_T0 = time.perf_counter()
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 import os
+import sys
 import threading
 from pathlib import Path
 import shutil
+# Mesmo módulo svs_utils que src/analyze.py usa (um único registro de importações)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+from svs_utils import startup_profiling_requested, report_startup
+from normalize_labels import normalize_lab_dir
 
 # --- Configurações ---
 PROJECT_ROOT = Path(__file__).parent
@@ -18,19 +25,6 @@ LAB_DIR.mkdir(parents=True, exist_ok=True)
 FEAT_DIR.mkdir(parents=True, exist_ok=True)
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 
-def normalize_phoneme(ph):
-    """Normaliza fonemas de silêncio/respiração para SP/AP"""
-    ph = ph.strip()
-    SILENCE_VARIANTS = {"sil", "pau", "silence", "#", "", "sp", "SIL", "PAU", "p", "S"}
-    BREATH_VARIANTS = {"br", "bre", "breath", "AP", "ap", "BR", "BRE", "b"}
-    
-    if ph in SILENCE_VARIANTS:
-        return "SP"
-    elif ph in BREATH_VARIANTS:
-        return "AP"
-    else:
-        return ph
-    
 class SVSApp:
     def __init__(self, root):
         self.root = root
@@ -127,22 +121,15 @@ class SVSApp:
                 wav_dest = RAW_DIR / f"{name}.wav"
                 shutil.copy2(paths["wav"], wav_dest)
 
-                # Ler, normalizar e salvar .lab
+                # Copiar .lab (normalizado logo abaixo, no próprio LAB_DIR)
                 lab_dest = LAB_DIR / f"{name}.lab"
-                with open(paths["lab"], "r", encoding="utf-8") as fin, \
-                     open(lab_dest, "w", encoding="utf-8") as fout:
-                    for line in fin:
-                        parts = line.strip().split()
-                        if len(parts) == 3:
-                            start, end, ph = parts
-                            ph_norm = normalize_phoneme(ph)
-                            fout.write(f"{start} {end} {ph_norm}\n")
-                        else:
-                            fout.write(line)  # mantém linhas inválidas como estão
+                shutil.copyfile(paths["lab"], lab_dest)
 
                 self.file_pairs[name] = {"wav": wav_dest, "lab": lab_dest}
                 self.tree.insert("", "end", values=(f"{name}.wav", f"{name}.lab"))
 
+            normalize_lab_dir(LAB_DIR, files=[self.file_pairs[name]["lab"] for name in new_pairs])
+
             self.log(f"✅ {len(new_pairs)} novo(s) par(es) carregado(s) e normalizados. Total: {len(self.file_pairs)}")
             self.btn_extract.config(state='normal')
         except Exception as e:
@@ -160,10 +147,16 @@ class SVSApp:
     def _extract_all_thread(self):
         self.log(f"🚀 Iniciando extração de {len(self.file_pairs)} arquivo(s)...")
         success = 0
+        try:
+            # Importado uma vez, no primeiro uso (carrega librosa/pyworld)
+            from src.analyze import analyze_wav
+        except Exception as e:
+            self.log(f"❌ Falha ao carregar o módulo de análise: {e}")
+            self.btn_extract.config(state='normal')
+            return
         for name in self.file_pairs:
             try:
                 self.log(f"  → Processando: {name}")
-                from src.analyze import analyze_wav
                 analyze_wav(
                     str(RAW_DIR / f"{name}.wav"),
                     str(LAB_DIR / f"{name}.lab"),
@@ -195,4 +188,6 @@ class SVSApp:
 if __name__ == "__main__":
     root = tk.Tk()
     app = SVSApp(root)
+    if startup_profiling_requested():
+        root.after_idle(lambda: report_startup("primeira janela", _T0))
     root.mainloop()
\ No newline at end of file
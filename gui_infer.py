@@ -1,30 +1,37 @@
 # gui_infer.py
+import time
+_T0 = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
-import numpy as np
+import sys
+import pickle
 from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+from svs_utils import lazy_import, startup_profiling_requested, report_startup
 
 PROJECT_ROOT = Path(__file__).parent
 MODEL_PATH = PROJECT_ROOT / "models" / "phoneme_stats.pkl"
 OUTPUT_DIR = PROJECT_ROOT / "examples"
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-# Verificar se modelo existe
-if not MODEL_PATH.exists():
-    raise FileNotFoundError(f"Modelo não encontrado! Execute primeiro a interface principal e construa o modelo.\n{MODEL_PATH}")
-
-# Carregar banco fonêmico (mesmo do synthesize.py)
-import pickle
-with open(MODEL_PATH, "rb") as f:
-    PHONEME_DB = pickle.load(f)
-
 # Parâmetros WORLD
 SR = 22050
 FRAME_PERIOD = 5.0
 FFT_SIZE = 1024
-SILENCE_SP = np.ones(FFT_SIZE // 2 + 1, dtype=np.float64)
-SILENCE_AP = np.zeros(FFT_SIZE // 2 + 1, dtype=np.float64)
+
+# Banco fonêmico (mesmo do synthesize.py): carregado só na primeira síntese
+_PHONEME_DB = None
+
+def get_phoneme_db():
+    """Carrega (uma vez) o banco fonêmico; a janela abre mesmo sem modelo"""
+    global _PHONEME_DB
+    if _PHONEME_DB is None:
+        if not MODEL_PATH.exists():
+            raise FileNotFoundError(f"Modelo não encontrado! Execute primeiro a interface principal e construa o modelo.\n{MODEL_PATH}")
+        with open(MODEL_PATH, "rb") as f:
+            _PHONEME_DB = pickle.load(f)
+    return _PHONEME_DB
 
 def generate_lab_from_table(table_data):
     """Gera conteúdo .lab em microssegundos a partir da tabela"""
@@ -39,6 +46,11 @@ def generate_lab_from_table(table_data):
 
 def synthesize_from_table(table_data, output_wav):
     """Sintetiza diretamente a partir da lista de (fonema, duração_ms, pitch_hz)"""
+    np = lazy_import("numpy")
+    PHONEME_DB = get_phoneme_db()
+    SILENCE_SP = np.ones(FFT_SIZE // 2 + 1, dtype=np.float64)
+    SILENCE_AP = np.zeros(FFT_SIZE // 2 + 1, dtype=np.float64)
+
     # Calcular duração total em segundos
     total_ms = sum(dur for _, dur, _ in table_data)
     total_sec = total_ms / 1000.0
@@ -70,8 +82,8 @@ def synthesize_from_table(table_data, output_wav):
         time_ms += dur_ms
 
     # Síntese com WORLD
-    import pyworld as pw
-    import soundfile as sf
+    pw = lazy_import("pyworld")
+    sf = lazy_import("soundfile")
     y = pw.synthesize(f0, sp, ap, SR, frame_period=FRAME_PERIOD)
     sf.write(output_wav, y, SR)
 
@@ -206,4 +218,6 @@ class InferGUI:
 if __name__ == "__main__":
     root = tk.Tk()
     app = InferGUI(root)
+    if startup_profiling_requested():
+        root.after_idle(lambda: report_startup("primeira janela", _T0))
     root.mainloop()
\ No newline at end of file
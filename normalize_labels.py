@@ -1,5 +1,10 @@
 # normalize_labels.py
 import os
+import json
+import shutil
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Configuração: mapeamento de fonemas para padrão SP/AP
@@ -8,58 +13,163 @@ BREATH_VARIANTS = {"br", "bre", "breath", "AP", "ap", "BR", "BRE"}
 
 # Diretório dos arquivos .lab
 LAB_DIR = Path("data/lab")
-LAB_DIR.mkdir(exist_ok=True)
 
-def normalize_lab_file(filepath):
-    with open(filepath, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+# Registro dos arquivos já normalizados (tamanho, mtime e hash do conteúdo)
+CACHE_NAME = ".normalized.json"
+PARALLEL_MIN_FILES = 64  # abaixo disso o pool de processos não compensa
+
+# Muda se o mapeamento mudar, invalidando o registro
+MAPPING_SIGNATURE = hashlib.sha1(
+    repr((sorted(SILENCE_VARIANTS), sorted(BREATH_VARIANTS))).encode("utf-8")
+).hexdigest()
+
+def normalize_phoneme(ph):
+    """Normaliza fonemas de silêncio/respiração para SP/AP"""
+    ph = ph.strip()
+    if ph in SILENCE_VARIANTS:
+        return "SP"
+    elif ph in BREATH_VARIANTS:
+        return "AP"
+    else:
+        return ph
 
-    normalized_lines = []
+def normalize_line(line):
+    """Normaliza uma linha do .lab; devolve a própria linha se nada mudar"""
+    parts = line.split()
+    if len(parts) != 3:
+        return line
+    start, end, ph = parts
+    new_ph = normalize_phoneme(ph)
+    if new_ph == ph:
+        return line
+    ending = line[len(line.rstrip("\r\n")):]
+    return f"{start} {end} {new_ph}{ending}"
+
+def _normalized_lines(filepath):
+    with open(filepath, "rb") as f:
+        for raw in f:
+            yield raw, normalize_line(raw.decode("utf-8")).encode("utf-8")
+
+def normalize_lab_file(filepath):
+    """Normaliza um .lab lendo linha a linha. Só reescreve o arquivo (de forma
+    atômica) se algum fonema mudar. Retorna (mudou, sha1 do conteúdo final)."""
+    filepath = Path(filepath)
+    digest = hashlib.sha1()
     changed = False
+    for raw, out in _normalized_lines(filepath):
+        changed |= out != raw
+        digest.update(out)
+
+    if changed:
+        fd, tmp = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fout:
+                for _, out in _normalized_lines(filepath):
+                    fout.write(out)
+            shutil.copymode(filepath, tmp)
+            os.replace(tmp, filepath)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    return changed, digest.hexdigest()
+
+def _file_sha1(filepath):
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _normalize_worker(path):
+    """Worker do pool: normaliza e devolve a entrada do registro"""
+    changed, sha1 = normalize_lab_file(path)
+    st = os.stat(path)
+    return path, changed, {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": sha1}
+
+def _load_cache(lab_dir):
+    try:
+        with open(lab_dir / CACHE_NAME, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("mapping") != MAPPING_SIGNATURE:
+        return {}
+    return data.get("files", {})
+
+def _save_cache(lab_dir, files):
+    fd, tmp = tempfile.mkstemp(dir=lab_dir, prefix=f"{CACHE_NAME}.", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"mapping": MAPPING_SIGNATURE, "files": files}, f, indent=1, sort_keys=True)
+    os.replace(tmp, lab_dir / CACHE_NAME)
 
-    for line in lines:
-        parts = line.strip().split()
-        if len(parts) == 3:
-            start, end, ph = parts
-            orig_ph = ph
+def normalize_lab_dir(lab_dir=LAB_DIR, files=None, workers=None):
+    """Normaliza os .lab de lab_dir (ou só `files`, que devem estar em lab_dir).
 
-            # Normalizar silêncio
-            if ph in SILENCE_VARIANTS:
-                ph = "SP"
-            # Normalizar respiração
-            elif ph in BREATH_VARIANTS:
-                ph = "AP"
+    Arquivos com tamanho e mtime iguais aos do registro são pulados sem leitura;
+    se só o mtime mudou (ex.: cópia feita pela GUI), o hash decide.
+    Retorna {nome: "alterado" | "sem alterações" | "pulado"}.
+    """
+    lab_dir = Path(lab_dir)
+    paths = sorted(Path(p) for p in files) if files is not None else sorted(lab_dir.glob("*.lab"))
+    cache = _load_cache(lab_dir)
+    if files is None:
+        # Esquecer arquivos que não existem mais
+        names = {p.name for p in paths}
+        cache = {name: entry for name, entry in cache.items() if name in names}
 
-            if ph != orig_ph:
-                changed = True
+    status = {}
+    pending = []
+    refreshed = False
+    for path in paths:
+        entry = cache.get(path.name)
+        st = path.stat()
+        if entry and entry["size"] == st.st_size:
+            if entry["mtime_ns"] == st.st_mtime_ns:
+                status[path.name] = "pulado"
+                continue
+            if _file_sha1(path) == entry["sha1"]:
+                # Conteúdo já normalizado: só atualiza o mtime no registro
+                status[path.name] = "pulado"
+                cache[path.name] = dict(entry, mtime_ns=st.st_mtime_ns)
+                refreshed = True
+                continue
+        pending.append(str(path))
 
-            normalized_lines.append(f"{start} {end} {ph}\n")
-        else:
-            normalized_lines.append(line)
+    if len(pending) >= PARALLEL_MIN_FILES and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_normalize_worker, pending, chunksize=16))
+    else:
+        results = [_normalize_worker(p) for p in pending]
 
-    # Salvar de volta (sobrescreve o original)
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.writelines(normalized_lines)
+    for path, changed, entry in results:
+        name = Path(path).name
+        status[name] = "alterado" if changed else "sem alterações"
+        cache[name] = entry
 
-    return changed
+    if pending or refreshed or files is None:
+        _save_cache(lab_dir, cache)
+    return status
 
 def main():
-    lab_files = list(LAB_DIR.glob("*.lab"))
-    if not lab_files:
+    LAB_DIR.mkdir(parents=True, exist_ok=True)
+    status = normalize_lab_dir(LAB_DIR)
+    if not status:
         print("⚠️ Nenhum arquivo .lab encontrado em data/lab/")
         return
 
-    print(f"🔍 Encontrados {len(lab_files)} arquivos .lab. Normalizando...")
-    total_changed = 0
+    total_changed = sum(1 for s in status.values() if s == "alterado")
+    total_skipped = sum(1 for s in status.values() if s == "pulado")
+    print(f"🔍 Encontrados {len(status)} arquivos .lab ({total_skipped} já normalizados). Normalizando...")
 
-    for lab_file in lab_files:
-        if normalize_lab_file(lab_file):
-            print(f" ✅ {lab_file.name}")
-            total_changed += 1
-        else:
-            print(f" ➖ {lab_file.name} (sem alterações)")
+    for name, s in sorted(status.items()):
+        if s == "alterado":
+            print(f" ✅ {name}")
+        elif s == "sem alterações":
+            print(f" ➖ {name} (sem alterações)")
 
-    print(f"\n✨ Normalização concluída! {total_changed}/{len(lab_files)} arquivos modificados.")
+    print(f"\n✨ Normalização concluída! {total_changed}/{len(status)} arquivos modificados.")
     print("\nPadronização aplicada:")
     print("  → Silêncio: qualquer variação → 'SP'")
     print("  → Respiração: qualquer variação → 'AP'")
@@ -1,20 +1,31 @@
 # src/analyze.py
+import time
+_T0 = time.perf_counter()
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
 import numpy as np
-import librosa
-import pyworld as pw
-from svs_utils import load_lab_file, align_phonemes_to_frames
-import matplotlib
-matplotlib.use('Agg')  # Usa backend não-interativo
-import matplotlib.pyplot as plt
+from svs_utils import (load_lab_file, align_phonemes_to_frames, time_to_frame, lazy_import,
+                       frame_alignment_step, frame_to_sample,
+                       startup_profiling_requested, report_startup, PROFILE_FLAG)
 
 # Configurações seguras para Windows
 SR = 22050          # Taxa fixa (reduz uso de memória)
 FRAME_PERIOD = 5.0  # ms
 FFT_SIZE = 1024      # Reduzido para evitar "Fail to allocate bitmap"
 
+# Extração guiada por rótulos: só analisa os trechos rotulados + contexto
+SILENCE_LABELS = {"SP", "sil", "pau", "#", ""}
+CONTEXT_PADDING_MS = 50.0   # contexto ao redor de cada trecho (guardado e usado na análise)
+SILENCE_SAMPLE_MS = 1000.0  # total de silêncio analisado por arquivo (modelo de silêncio)
+SILENCE_BLOCK_MS = 100.0    # tamanho de cada bloco de silêncio amostrado
+
+def _pyplot():
+    """matplotlib só é carregado na hora de desenhar o gráfico"""
+    matplotlib = lazy_import("matplotlib")
+    matplotlib.use('Agg')  # Usa backend não-interativo
+    return lazy_import("matplotlib.pyplot")
+
 def sanitize_audio(x):
     """Remove NaN, inf e normaliza volume para evitar picos"""
     x = np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
@@ -23,8 +34,97 @@ def sanitize_audio(x):
         x = x / max_val * 0.95  # Evita saturação
     return x
 
-def analyze_wav(wav_path, lab_path, out_dir):
+def _runs(mask):
+    """Intervalos [início, fim) dos trechos True de uma máscara"""
+    d = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(d == 1), np.flatnonzero(d == -1)))
+
+def plan_guided_frames(lab, total_frames):
+    """Máscaras (a analisar, blocos de silêncio amostrados): fonemas rotulados
+    (exceto silêncio) com contexto, mais blocos de silêncio espalhados pelo arquivo"""
+    pad = time_to_frame(CONTEXT_PADDING_MS / 1000.0, FRAME_PERIOD)
+    mask = np.zeros(total_frames, dtype=bool)
+    for start, end, ph in lab:
+        if ph in SILENCE_LABELS:
+            continue
+        f1 = max(0, time_to_frame(start, FRAME_PERIOD) - pad)
+        f2 = min(total_frames, time_to_frame(end, FRAME_PERIOD) + pad)
+        mask[f1:f2] = True
+
+    # Amostra do silêncio: blocos uniformemente espaçados entre as pausas
+    block = max(1, time_to_frame(SILENCE_BLOCK_MS / 1000.0, FRAME_PERIOD))
+    budget = time_to_frame(SILENCE_SAMPLE_MS / 1000.0, FRAME_PERIOD)
+    blocks = [(a, min(a + block, b)) for a0, b in _runs(~mask) for a in range(a0, b, block)]
+    n_pick = min(len(blocks), -(-budget // block))
+    sampled = np.zeros(total_frames, dtype=bool)
+    if n_pick:
+        for i in np.unique(np.linspace(0, len(blocks) - 1, n_pick).round().astype(int)):
+            a, b = blocks[i]
+            sampled[a:b] = True
+    return mask | sampled, sampled
+
+def analyze_guided(x, lab, pw):
+    """WORLD só nos trechos da máscara; o resto recebe f0=0 e o espectro médio
+    dos blocos de silêncio amostrados. Retorna f0, sp, ap, a máscara de frames
+    analisados e a dos frames que mantêm o rótulo (fonemas + blocos de silêncio)."""
+    total_frames = int(1000.0 * len(x) / SR / FRAME_PERIOD) + 1  # mesmo tamanho que o dio
+    mask, sampled = plan_guided_frames(lab, total_frames)
+    step = frame_alignment_step(SR, FRAME_PERIOD)
+    pad = time_to_frame(CONTEXT_PADDING_MS / 1000.0, FRAME_PERIOD)
+
+    # Trechos próximos são analisados juntos (evita repetir o contexto)
+    regions = []
+    for a, b in _runs(mask):
+        if regions and a - regions[-1][1] <= 2 * pad:
+            regions[-1] = (regions[-1][0], b)
+        else:
+            regions.append((a, b))
+
+    f0 = np.zeros(total_frames, dtype=np.float64)
+    sp = np.zeros((total_frames, FFT_SIZE // 2 + 1), dtype=np.float64)
+    ap = np.zeros((total_frames, FFT_SIZE // 2 + 1), dtype=np.float64)
+    analyzed = np.zeros(total_frames, dtype=bool)
+
+    for a, b in regions:
+        # Início alinhado a um frame com amostra inteira: frame j do trecho = frame s_frame + j
+        s_frame = max(0, a - pad) // step * step
+        e_frame = min(total_frames, b + pad)
+        s0 = frame_to_sample(s_frame, SR, FRAME_PERIOD)
+        s1 = min(len(x), int(np.ceil(e_frame * FRAME_PERIOD / 1000.0 * SR)) + 1)
+        seg = np.ascontiguousarray(x[s0:s1])
+
+        _f0, t = pw.dio(seg, SR, frame_period=FRAME_PERIOD)
+        seg_f0 = pw.stonemask(seg, _f0, t, SR)
+        seg_sp = pw.cheaptrick(seg, seg_f0, t, SR, fft_size=FFT_SIZE)
+        seg_ap = pw.d4c(seg, seg_f0, t, SR, fft_size=FFT_SIZE)
+
+        b = min(b, s_frame + len(seg_f0))
+        f0[a:b] = seg_f0[a - s_frame:b - s_frame]
+        sp[a:b] = seg_sp[a - s_frame:b - s_frame]
+        ap[a:b] = seg_ap[a - s_frame:b - s_frame]
+        analyzed[a:b] = True
+
+    # O contexto em volta da voz tem vazamento dela: só os blocos amostrados
+    # representam o silêncio (preenchimento e rótulo "SP" para o build_db.py)
+    phonemes = np.array(align_phonemes_to_frames(lab, total_frames, FRAME_PERIOD))
+    is_silence = np.isin(phonemes, list(SILENCE_LABELS))
+    silent = analyzed & sampled & is_silence
+    labeled = analyzed & (~is_silence | silent)
+    if silent.any():
+        fill_sp = sp[silent].mean(axis=0)
+        fill_ap = ap[silent].mean(axis=0)
+    else:
+        fill_sp = np.full(FFT_SIZE // 2 + 1, 1e-12)
+        fill_ap = np.ones(FFT_SIZE // 2 + 1)
+    sp[~analyzed] = fill_sp
+    ap[~analyzed] = fill_ap
+    return f0, sp, ap, analyzed, labeled
+
+def analyze_wav(wav_path, lab_path, out_dir, guided=False):
     try:
+        librosa = lazy_import("librosa")
+        pw = lazy_import("pyworld")
+
         # 1. Carregar áudio bruto
         print(f"🔊 Carregando: {os.path.basename(wav_path)}")
         x, orig_sr = librosa.load(wav_path, sr=None, mono=True)
@@ -43,16 +143,25 @@ def analyze_wav(wav_path, lab_path, out_dir):
         print(f"  📏 Duração: {len(x)/SR:.2f} s | Amostras: {len(x)}")
 
         # 4. Extração WORLD
-        print("  🌍 Extraindo features com WORLD...")
-        _f0, t = pw.dio(x, SR, frame_period=FRAME_PERIOD)
-        f0 = pw.stonemask(x, _f0, t, SR)
-        sp = pw.cheaptrick(x, f0, t, SR, fft_size=FFT_SIZE)
-        ap = pw.d4c(x, f0, t, SR, fft_size=FFT_SIZE)
+        lab = load_lab_file(lab_path)
+        if guided:
+            print("  🌍 Extraindo features com WORLD (guiado pelos rótulos)...")
+            f0, sp, ap, analyzed, labeled = analyze_guided(x, lab, pw)
+            print(f"  ⏩ Analisados {analyzed.sum()}/{len(analyzed)} frames "
+                  f"({100.0 * analyzed.mean():.0f}%)")
+        else:
+            print("  🌍 Extraindo features com WORLD...")
+            _f0, t = pw.dio(x, SR, frame_period=FRAME_PERIOD)
+            f0 = pw.stonemask(x, _f0, t, SR)
+            sp = pw.cheaptrick(x, f0, t, SR, fft_size=FFT_SIZE)
+            ap = pw.d4c(x, f0, t, SR, fft_size=FFT_SIZE)
 
         # 5. Alinhar fonemas
-        lab = load_lab_file(lab_path)
         total_frames = len(f0)
         phonemes = align_phonemes_to_frames(lab, total_frames, FRAME_PERIOD)
+        if guided:
+            # Frames preenchidos e contexto de silêncio ficam sem rótulo: build_db.py os ignora
+            phonemes = ["" if not ok else ph for ph, ok in zip(phonemes, labeled)]
 
         # 6. Salvar
         name = os.path.splitext(os.path.basename(wav_path))[0]
@@ -64,6 +173,7 @@ def analyze_wav(wav_path, lab_path, out_dir):
 
         # 7. Gráfico de alinhamento
         time_axis = np.arange(len(f0)) * (FRAME_PERIOD / 1000.0)
+        plt = _pyplot()
         plt.figure(figsize=(12, 4))
         plt.plot(time_axis, f0, label="F0", linewidth=1)
         for start, end, ph in lab:
@@ -89,7 +199,14 @@ def analyze_wav(wav_path, lab_path, out_dir):
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 4:
-        print("Uso: python analyze.py <wav> <lab> <out_dir>")
+    profile = startup_profiling_requested()
+    if profile:
+        report_startup("inicialização", _T0)
+    guided = "--guided" in sys.argv
+    args = [a for a in sys.argv[1:] if a not in (PROFILE_FLAG, "--guided")]
+    if len(args) != 3:
+        print(f"Uso: python analyze.py <wav> <lab> <out_dir> [--guided] [{PROFILE_FLAG}]")
         sys.exit(1)
-    analyze_wav(sys.argv[1], sys.argv[2], sys.argv[3])
\ No newline at end of file
+    analyze_wav(args[0], args[1], args[2], guided)
+    if profile:
+        report_startup("total", _T0)
\ No newline at end of file
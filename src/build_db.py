@@ -4,73 +4,114 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
 import numpy as np
 import pickle
-from collections import defaultdict
 from pathlib import Path
 from svs_utils import load_lab_file, time_to_frame, align_phonemes_to_frames
+from stats_sketch import spectrum_sketch, aperiodicity_sketch
 
 FEATURES_DIR = Path("data/features")
 
-def build_phoneme_db():
-    stats = defaultdict(lambda: {"sp": [], "ap": []})
-    all_sp = []
-    all_ap = []
-    all_ph = []
+# Detecção de elocuções suspeitas (rótulos errados, ruído, etc.)
+OUTLIER_MIN_FRAMES = 5        # frames mínimos do fonema na elocução para julgá-la
+OUTLIER_BIN_FRACTION = 0.5    # fração de bins fora das cercas de Tukey para marcar (frame ou elocução)
+
+def _new_sketches(n_dims):
+    return {"sp": spectrum_sketch(n_dims), "ap": aperiodicity_sketch(n_dims), "n": 0}
 
-    # Coletar todos os dados primeiro
-    for file in os.listdir(FEATURES_DIR):
+def _iter_features(load_ap=True, warn=True):
+    """Percorre data/features um arquivo por vez: (base, fonemas, sp, ap)"""
+    for file in sorted(os.listdir(FEATURES_DIR)):
         if not file.endswith("_ph.npy"):
             continue
         base = file.replace("_ph.npy", "")
         ph_seq = np.load(os.path.join(FEATURES_DIR, file), allow_pickle=True)
         sp = np.load(os.path.join(FEATURES_DIR, base + "_sp.npy"))
-        ap = np.load(os.path.join(FEATURES_DIR, base + "_ap.npy"))
+        ap = np.load(os.path.join(FEATURES_DIR, base + "_ap.npy")) if load_ap else None
 
         if len(ph_seq) != len(sp):
-            print(f"⚠️ Tamanho inconsistente em {base}. Ignorando.")
+            if warn:
+                print(f"⚠️ Tamanho inconsistente em {base}. Ignorando.")
             continue
 
-        # Acumular para fonemas normais
-        for i, ph in enumerate(ph_seq):
-            if ph and ph not in {"SP", "AP"} and i < len(sp):
-                stats[ph]["sp"].append(sp[i])
-                stats[ph]["ap"].append(ap[i])
+        yield base, np.asarray(ph_seq, dtype=str), sp, ap
+
+def build_phoneme_db():
+    """Constrói models/phoneme_stats.pkl em duas passadas sobre data/features:
+    a 1ª acumula os sketches (sp/ap); a 2ª relê só _ph/_sp para contar frames
+    e elocuções atípicos contra as cercas finais."""
+    sketches = {}          # fonema → sketches de sp/ap (memória fixa por fonema)
+    silence = None         # sketches dos frames SP/AP
+    n_dims = None
 
-        # Acumular tudo para SP/AP
-        all_sp.extend(sp)
-        all_ap.extend(ap)
-        all_ph.extend(ph_seq)
+    # 1ª passada: cada arquivo é carregado, acumulado e descartado
+    print("📊 1ª passada: acumulando estatísticas por fonema...")
+    for base, ph_seq, sp, ap in _iter_features():
+        n_dims = sp.shape[1]
+
+        for ph in map(str, np.unique(ph_seq)):
+            if not ph:
+                continue
+            mask = ph_seq == ph
+            if ph in {"SP", "AP"}:
+                # Acumular para SP/AP
+                if silence is None:
+                    silence = _new_sketches(n_dims)
+                target = silence
+            else:
+                # Acumular para fonemas normais
+                if ph not in sketches:
+                    sketches[ph] = _new_sketches(n_dims)
+                target = sketches[ph]
+            target["sp"].update(sp[mask])
+            target["ap"].update(ap[mask])
+            target["n"] += int(mask.sum())
 
     # Construir banco de fonemas normais
     db = {}
-    for ph, data in stats.items():
-        db[ph] = {
-            "sp_mean": np.mean(data["sp"], axis=0),
-            "ap_mean": np.mean(data["ap"], axis=0)
-        }
-        print(f"Fonema '{ph}': {len(data['sp'])} exemplos")
+    for ph, data in sketches.items():
+        entry = {"n_frames": data["n"], "n_outlier_frames": 0, "n_outlier_utterances": 0}
+        entry.update(data["sp"].summary("sp"))
+        entry.update(data["ap"].summary("ap"))
+        db[ph] = entry
 
-    # Extrair SP/AP reais
-    silence_sp = []
-    silence_ap = []
-    for i, ph in enumerate(all_ph):
-        if ph in {"SP", "AP"} and i < len(all_sp):
-            silence_sp.append(all_sp[i])
-            silence_ap.append(all_ap[i])
+    # 2ª passada (só _ph/_sp): contar frames atípicos e marcar elocuções cujo
+    # espectro médio de algum fonema foge das cercas finais da distribuição
+    print("🔁 2ª passada: procurando frames e elocuções atípicos...")
+    fences = {ph: data["sp"].fences() for ph, data in sketches.items()}
+    outlier_utterances = {}
+    for base, ph_seq, sp, _ in _iter_features(load_ap=False, warn=False):
+        for ph in map(str, np.unique(ph_seq)):
+            if ph not in fences:
+                continue
+            mask = ph_seq == ph
+            log_frames = np.log10(np.maximum(sp[mask], 1e-300))
+            low, high = fences[ph]
+            outside = np.mean((log_frames < low) | (log_frames > high), axis=1)
+            db[ph]["n_outlier_frames"] += int((outside > OUTLIER_BIN_FRACTION).sum())
+            if mask.sum() < OUTLIER_MIN_FRAMES:
+                continue
+            log_sp = log_frames.mean(axis=0)
+            if np.mean((log_sp < low) | (log_sp > high)) > OUTLIER_BIN_FRACTION:
+                outlier_utterances.setdefault(base, []).append(ph)
+                db[ph]["n_outlier_utterances"] += 1
+    for ph, entry in db.items():
+        print(f"Fonema '{ph}': {entry['n_frames']} exemplos ({entry['n_outlier_frames']} frames atípicos)")
+    for base, phs in sorted(outlier_utterances.items()):
+        print(f"⚠️ Elocução suspeita: {base} (fonemas: {', '.join(phs)})")
+    db["__OUTLIER_UTTERANCES"] = outlier_utterances
 
-    if silence_sp:
-        db["__SILENCE_SP"] = np.mean(silence_sp, axis=0)
-        db["__SILENCE_AP"] = np.mean(silence_ap, axis=0)
-        print(f"✅ Silêncio/respiração: {len(silence_sp)} frames usados.")
+    # Extrair SP/AP reais
+    if silence is not None:
+        db["__SILENCE_SP"] = silence["sp"].mean.copy()
+        db["__SILENCE_AP"] = silence["ap"].mean.copy()
+        db["__SILENCE_SP_MEDIAN"] = silence["sp"].quantile(0.5)
+        db["__SILENCE_AP_MEDIAN"] = silence["ap"].quantile(0.5)
+        print(f"✅ Silêncio/respiração: {silence['n']} frames usados.")
     else:
         # Fallback suave (quase silêncio)
-        if all_sp:
-            dummy_sp = np.ones_like(all_sp[0]) * 0.001
-            dummy_ap = np.zeros_like(all_ap[0])
-        else:
-            dummy_sp = np.ones(513) * 0.001  # WORLD usa 513 por padrão (1024 FFT)
-            dummy_ap = np.zeros(513)
-        db["__SILENCE_SP"] = dummy_sp
-        db["__SILENCE_AP"] = dummy_ap
+        if n_dims is None:
+            n_dims = 513  # WORLD usa 513 por padrão (1024 FFT)
+        db["__SILENCE_SP"] = np.ones(n_dims) * 0.001
+        db["__SILENCE_AP"] = np.zeros(n_dims)
         print("⚠️ Nenhum SP/AP encontrado. Usando fallback suave.")
 
     # Salvar modelo
@@ -0,0 +1,117 @@
+# src/stats_sketch.py
+import numpy as np
+
+class SpectrumSketch:
+    """Estatísticas por bin em memória fixa: média/variância exatas (Welford)
+    e histograma para quantis. Dois sketches com os mesmos parâmetros podem
+    ser combinados com merge()."""
+
+    def __init__(self, n_dims, lo, hi, n_buckets=128, log=False):
+        self.n_dims = n_dims
+        self.lo = lo
+        self.hi = hi
+        self.n_buckets = n_buckets
+        self.log = log  # histograma em log10 (espectro) ou linear (aperiodicidade)
+        self.width = (hi - lo) / n_buckets
+        self.counts = np.zeros((n_dims, n_buckets), dtype=np.int32)
+        self.n = 0
+        self.mean = np.zeros(n_dims, dtype=np.float64)
+        self.m2 = np.zeros(n_dims, dtype=np.float64)
+
+    def _transform(self, x):
+        if self.log:
+            return np.log10(np.maximum(x, 1e-300))
+        return x
+
+    def _inverse(self, t):
+        if self.log:
+            return 10.0 ** t
+        return t
+
+    def update(self, frames):
+        """Acumula um bloco de frames (n_frames x n_dims)"""
+        frames = np.asarray(frames, dtype=np.float64)
+        if frames.ndim == 1:
+            frames = frames[None, :]
+        k = len(frames)
+        if k == 0:
+            return
+
+        # Welford em bloco (fórmula de Chan)
+        block_mean = frames.mean(axis=0)
+        block_m2 = ((frames - block_mean) ** 2).sum(axis=0)
+        self._combine(k, block_mean, block_m2)
+
+        # Histograma: um bincount para todos os bins de uma vez
+        idx = np.floor((self._transform(frames) - self.lo) / self.width).astype(np.int64)
+        np.clip(idx, 0, self.n_buckets - 1, out=idx)
+        flat = idx + np.arange(self.n_dims) * self.n_buckets
+        self.counts += np.bincount(flat.ravel(), minlength=self.n_dims * self.n_buckets).reshape(self.counts.shape)
+
+    def _combine(self, k, other_mean, other_m2):
+        total = self.n + k
+        delta = other_mean - self.mean
+        self.mean = self.mean + delta * (k / total)
+        self.m2 = self.m2 + other_m2 + delta ** 2 * (self.n * k / total)
+        self.n = total
+
+    def merge(self, other):
+        """Incorpora outro sketch (ex.: calculado em outro processo)"""
+        if other.n == 0:
+            return
+        self._combine(other.n, other.mean, other.m2)
+        self.counts += other.counts
+
+    @property
+    def var(self):
+        if self.n < 2:
+            return np.zeros(self.n_dims)
+        return self.m2 / (self.n - 1)
+
+    def _quantile_t(self, q):
+        """Quantil no domínio do histograma, com interpolação dentro do bucket"""
+        cum = np.cumsum(self.counts, axis=1)
+        target = q * self.n
+        k = np.argmax(cum >= target, axis=1)
+        rows = np.arange(self.n_dims)
+        prev = np.where(k > 0, cum[rows, k - 1], 0)
+        in_bucket = np.maximum(self.counts[rows, k], 1)
+        frac = np.clip((target - prev) / in_bucket, 0.0, 1.0)
+        return self.lo + (k + frac) * self.width
+
+    def quantile(self, q):
+        return self._inverse(self._quantile_t(q))
+
+    def fences(self, k=1.5):
+        """Limites de Tukey (q1 - k*IQR, q3 + k*IQR) no domínio do histograma"""
+        q1 = self._quantile_t(0.25)
+        q3 = self._quantile_t(0.75)
+        iqr = q3 - q1
+        return q1 - k * iqr, q3 + k * iqr
+
+    def outlier_counts(self, k=1.5):
+        """Nº de frames fora das cercas de Tukey, por bin"""
+        low, high = self.fences(k)
+        centers = self.lo + (np.arange(self.n_buckets) + 0.5) * self.width
+        outside = (centers[None, :] < low[:, None]) | (centers[None, :] > high[:, None])
+        return (self.counts * outside).sum(axis=1)
+
+    def summary(self, prefix):
+        """Campos gravados no modelo para este sketch"""
+        q1 = self.quantile(0.25)
+        q3 = self.quantile(0.75)
+        return {
+            f"{prefix}_mean": self.mean.copy(),
+            f"{prefix}_median": self.quantile(0.5),
+            f"{prefix}_iqr": q3 - q1,
+            f"{prefix}_std": np.sqrt(self.var),
+            f"{prefix}_outliers": self.outlier_counts(),
+        }
+
+def spectrum_sketch(n_dims):
+    """Sketch para envelope espectral (CheapTrick), em log10"""
+    return SpectrumSketch(n_dims, lo=-16.0, hi=4.0, n_buckets=160, log=True)
+
+def aperiodicity_sketch(n_dims):
+    """Sketch para aperiodicidade (D4C), valores em [0, 1]"""
+    return SpectrumSketch(n_dims, lo=0.0, hi=1.0, n_buckets=100, log=False)
@@ -1,4 +1,36 @@
-import numpy as np
+import os
+import sys
+import time
+import importlib
+from fractions import Fraction
+
+# Bibliotecas cujo carregamento domina o tempo de inicialização
+HEAVY_MODULES = ("numpy", "pyworld", "soundfile", "librosa", "matplotlib", "scipy")
+PROFILE_FLAG = "--profile-startup"
+
+_IMPORT_TIMES = {}
+
+def lazy_import(name):
+    """Importa um módulo só no primeiro uso, registrando quanto tempo levou"""
+    module = sys.modules.get(name)
+    if module is None:
+        t = time.perf_counter()
+        module = importlib.import_module(name)
+        _IMPORT_TIMES[name] = time.perf_counter() - t
+    return module
+
+def startup_profiling_requested(argv=None):
+    """True se a flag --profile-startup foi passada ou SVS_PROFILE_STARTUP=1"""
+    argv = sys.argv if argv is None else argv
+    return PROFILE_FLAG in argv or os.environ.get("SVS_PROFILE_STARTUP") == "1"
+
+def report_startup(label, t0):
+    """Imprime o tempo desde t0 e as bibliotecas pesadas já carregadas"""
+    print(f"⏱️ {label}: {(time.perf_counter() - t0) * 1000:.0f} ms")
+    for name, dt in _IMPORT_TIMES.items():
+        print(f"   {name}: {dt * 1000:.0f} ms (importado sob demanda)")
+    loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+    print(f"   Bibliotecas pesadas carregadas: {', '.join(loaded) or 'nenhuma'}")
 
 def load_lab_file(path):
     """Carrega .lab com tempos em unidades de 100ns (frequência de 10 MHz)"""
@@ -26,4 +58,13 @@ def align_phonemes_to_frames(lab_segments, total_frames, frame_period_ms=5.0):
         f2 = time_to_frame(end, frame_period_ms)
         for i in range(f1, min(f2, total_frames)):
             phoneme_seq[i] = ph
-    return phoneme_seq
\ No newline at end of file
+    return phoneme_seq
+
+def frame_alignment_step(sr, frame_period_ms=5.0):
+    """Menor passo (em frames) cujo início cai numa amostra inteira (ex.: 4 frames = 441 amostras)"""
+    samples_per_frame = Fraction(sr) * Fraction(str(frame_period_ms)) / 1000
+    return samples_per_frame.denominator
+
+def frame_to_sample(frame, sr, frame_period_ms=5.0):
+    """Amostra exata do início do frame (frame deve ser múltiplo de frame_alignment_step)"""
+    return int(Fraction(frame) * Fraction(sr) * Fraction(str(frame_period_ms)) / 1000)
\ No newline at end of file
@@ -1,45 +1,74 @@
 # src/synthesize.py
+import time
+_T0 = time.perf_counter()
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
 import numpy as np
-import pyworld as pw
-import soundfile as sf
-from svs_utils import load_lab_file, time_to_frame
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from svs_utils import (load_lab_file, time_to_frame, frame_alignment_step, frame_to_sample,
+                       lazy_import, startup_profiling_requested, report_startup, PROFILE_FLAG)
 from pathlib import Path
 
 SR = 22050
 FRAME_PERIOD = 5.0
 FFT_SIZE = 1024
 
-# Carregar banco de fonemas
+# Síntese paralela: a partitura é cortada no meio de pausas longas
+MIN_SPLIT_SILENCE_MS = 250.0  # pausa mínima para permitir um corte
+PHRASE_CONTEXT_MS = 100.0     # contexto extra renderizado em cada lado do corte (descartado)
+MIN_POOL_PHRASES = 4          # abaixo disso (ou de MIN_POOL_SECONDS) as frases são
+MIN_POOL_SECONDS = 20.0       # renderizadas no próprio processo: o pool não compensa
+
+# Banco de fonemas: carregado só na primeira síntese
 MODEL_PATH = Path("models/phoneme_stats.pkl")
-if not MODEL_PATH.exists():
-    raise FileNotFoundError(f"Modelo não encontrado! Execute 'build_db.py' primeiro.\n{MODEL_PATH}")
+_PHONEME_DB = None
 
-import pickle
-with open(MODEL_PATH, "rb") as f:
-    PHONEME_DB = pickle.load(f)
-
-# Carregar espectros reais de SP/AP
-if "__SILENCE_SP" in PHONEME_DB:
-    SILENCE_SP = PHONEME_DB["__SILENCE_SP"]
-    SILENCE_AP = PHONEME_DB["__SILENCE_AP"]
-else:
-    # Fallback (não deve acontecer se build_db.py rodou)
-    SILENCE_SP = np.ones(FFT_SIZE // 2 + 1, dtype=np.float64) * 0.001
-    SILENCE_AP = np.zeros(FFT_SIZE // 2 + 1, dtype=np.float64)
+def get_phoneme_db():
+    """Carrega (uma vez) o banco de fonemas gerado por build_db.py"""
+    global _PHONEME_DB
+    if _PHONEME_DB is None:
+        if not MODEL_PATH.exists():
+            raise FileNotFoundError(f"Modelo não encontrado! Execute 'build_db.py' primeiro.\n{MODEL_PATH}")
+        with open(MODEL_PATH, "rb") as f:
+            _PHONEME_DB = pickle.load(f)
+    return _PHONEME_DB
 
 SILENCE_PHONEMES = {"SP", "AP", "sil", "pau", "br", "#", ""}
 
-def synthesize_from_lab(lab_path, output_wav, default_pitch=261.63):
-    lab = load_lab_file(lab_path)
+# Estatística usada para o espectro de cada fonema ("mean" ou "median")
+STATISTICS = ("mean", "median")
+
+def silence_spectra(stat="mean"):
+    """Espectros de silêncio reais para a estatística pedida (média se não houver mediana)"""
+    db = get_phoneme_db()
+    if stat == "median" and "__SILENCE_SP_MEDIAN" in db:
+        return db["__SILENCE_SP_MEDIAN"], db["__SILENCE_AP_MEDIAN"]
+    if "__SILENCE_SP" in db:
+        return db["__SILENCE_SP"], db["__SILENCE_AP"]
+    # Fallback (não deve acontecer se build_db.py rodou)
+    return (np.ones(FFT_SIZE // 2 + 1, dtype=np.float64) * 0.001,
+            np.zeros(FFT_SIZE // 2 + 1, dtype=np.float64))
+
+def phoneme_spectra(ph, stat="mean"):
+    """sp/ap do fonema para a estatística pedida (modelos antigos só têm a média)"""
+    entry = get_phoneme_db()[ph]
+    if f"sp_{stat}" in entry:
+        return entry[f"sp_{stat}"], entry[f"ap_{stat}"]
+    return entry["sp_mean"], entry["ap_mean"]
+
+def build_parameters(lab, default_pitch, stat="mean"):
+    """Monta as sequências f0/sp/ap frame a frame a partir dos segmentos do .lab"""
+    if stat not in STATISTICS:
+        raise ValueError(f"Estatística inválida: '{stat}' (use {', '.join(STATISTICS)})")
+    silence_sp, silence_ap = silence_spectra(stat)
     total_time = lab[-1][1] if lab else 1.0
     total_frames = time_to_frame(total_time, FRAME_PERIOD) + 10
 
     f0 = np.zeros(total_frames, dtype=np.float64)
-    sp = np.zeros((total_frames, len(SILENCE_SP)), dtype=np.float64)
-    ap = np.zeros((total_frames, len(SILENCE_AP)), dtype=np.float64)
+    sp = np.zeros((total_frames, len(silence_sp)), dtype=np.float64)
+    ap = np.zeros((total_frames, len(silence_ap)), dtype=np.float64)
 
     for start, end, ph in lab:
         f1 = time_to_frame(start, FRAME_PERIOD)
@@ -51,26 +80,111 @@ def synthesize_from_lab(lab_path, output_wav, default_pitch=261.63):
         f0[f1:f2] = default_pitch
 
         if ph in SILENCE_PHONEMES:
-            sp[f1:f2] = SILENCE_SP
-            ap[f1:f2] = SILENCE_AP
-        elif ph in PHONEME_DB:
-            sp[f1:f2] = PHONEME_DB[ph]["sp_mean"]
-            ap[f1:f2] = PHONEME_DB[ph]["ap_mean"]
+            sp[f1:f2] = silence_sp
+            ap[f1:f2] = silence_ap
+        elif ph in get_phoneme_db():
+            sp[f1:f2], ap[f1:f2] = phoneme_spectra(ph, stat)
         else:
             print(f"⚠️ Fonema desconhecido: '{ph}'. Usando silêncio real.")
-            sp[f1:f2] = SILENCE_SP
-            ap[f1:f2] = SILENCE_AP
+            sp[f1:f2] = silence_sp
+            ap[f1:f2] = silence_ap
+
+    return f0, sp, ap
+
+def split_phrases(lab, total_frames):
+    """Divide [0, total_frames) em frases, cortando no meio das pausas SP/AP longas.
+
+    Os cortes ficam alinhados a frames cuja amostra inicial é inteira, para que
+    cada frase possa ser renderizada sozinha e recolocada na posição exata.
+    """
+    step = frame_alignment_step(SR, FRAME_PERIOD)
+    context = -(-time_to_frame(PHRASE_CONTEXT_MS / 1000.0, FRAME_PERIOD) // step) * step
+    min_frames = max(time_to_frame(MIN_SPLIT_SILENCE_MS / 1000.0, FRAME_PERIOD), 2 * context + step)
+
+    cuts = []
+    for start, end, ph in lab:
+        if ph not in SILENCE_PHONEMES:
+            continue
+        f1 = time_to_frame(start, FRAME_PERIOD)
+        f2 = min(time_to_frame(end, FRAME_PERIOD), total_frames)
+        if f2 - f1 < min_frames:
+            continue
+        cut = (f1 + f2) // 2 // step * step
+        # O contexto renderizado além do corte precisa cair dentro da pausa
+        if cut - context < f1 or cut + context > f2 or cut <= 0 or cut >= total_frames:
+            continue
+        if cuts and cut <= cuts[-1]:
+            continue
+        cuts.append(cut)
+
+    bounds = [0] + cuts + [total_frames]
+    return list(zip(bounds[:-1], bounds[1:])), context
+
+def _render_phrase(args):
+    """Worker: renderiza um trecho de parâmetros com o WORLD"""
+    f0, sp, ap = args
+    pw = lazy_import("pyworld")
+    return pw.synthesize(f0, sp, ap, SR, frame_period=FRAME_PERIOD)
+
+def render_phrases(f0, sp, ap, phrases, context, workers=1):
+    """Renderiza as frases (num pool se workers > 1) e concatena o áudio em ordem.
+
+    O áudio não depende de workers: cada frase é sempre renderizada sozinha.
+    """
+    total_frames = len(f0)
+    jobs = []
+    offsets = []
+    for a, b in phrases:
+        r1 = max(0, a - context)
+        r2 = min(total_frames, b + context)
+        jobs.append((f0[r1:r2], sp[r1:r2], ap[r1:r2]))
+        # Posição (relativa ao trecho renderizado) das amostras que pertencem à frase
+        base = frame_to_sample(r1, SR, FRAME_PERIOD)
+        keep_start = frame_to_sample(a, SR, FRAME_PERIOD) - base
+        keep_end = None if b == total_frames else frame_to_sample(b, SR, FRAME_PERIOD) - base
+        offsets.append((keep_start, keep_end))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(_render_phrase, jobs))
+    else:
+        rendered = [_render_phrase(job) for job in jobs]
+
+    pieces = [y[s:e] for y, (s, e) in zip(rendered, offsets)]
+    return np.concatenate(pieces)
+
+def synthesize_from_lab(lab_path, output_wav, default_pitch=261.63, workers=None, stat="mean"):
+    lab = load_lab_file(lab_path)
+    f0, sp, ap = build_parameters(lab, default_pitch, stat)
+
+    phrases, context = split_phrases(lab, len(f0))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(phrases))
+    duration = len(f0) * FRAME_PERIOD / 1000.0
+    if len(phrases) < MIN_POOL_PHRASES or duration < MIN_POOL_SECONDS:
+        workers = 1
 
-    y = pw.synthesize(f0, sp, ap, SR, frame_period=FRAME_PERIOD)
-    sf.write(output_wav, y, SR)
+    if workers > 1:
+        print(f"🧩 {len(phrases)} frases → {workers} processos")
+    y = render_phrases(f0, sp, ap, phrases, context, workers)
+    lazy_import("soundfile").write(output_wav, y, SR)
     print(f"🎵 Áudio salvo em: {output_wav}")
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) < 3:
-        print("Uso: python synthesize.py <lab> <output_wav> [pitch_Hz]")
+    profile = startup_profiling_requested()
+    if profile:
+        report_startup("inicialização", _T0)
+    stat = "median" if "--median" in sys.argv else "mean"
+    args = [a for a in sys.argv[1:] if a not in ("--median", PROFILE_FLAG)]
+    if len(args) < 2:
+        print(f"Uso: python synthesize.py <lab> <output_wav> [pitch_Hz] [n_processos] [--median] [{PROFILE_FLAG}]")
         sys.exit(1)
-    lab = sys.argv[1]
-    out = sys.argv[2]
-    pitch = float(sys.argv[3]) if len(sys.argv) > 3 else 261.63
-    synthesize_from_lab(lab, out, pitch)
\ No newline at end of file
+    lab = args[0]
+    out = args[1]
+    pitch = float(args[2]) if len(args) > 2 else 261.63
+    workers = int(args[3]) if len(args) > 3 else None
+    synthesize_from_lab(lab, out, pitch, workers, stat)
+    if profile:
+        report_startup("total", _T0)
\ No newline at end of file